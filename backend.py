@@ -1,38 +1,174 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from youtube_transcript_api import YouTubeTranscriptApi
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.concurrency import run_in_threadpool
+from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound, VideoUnavailable
 from urllib.parse import urlparse, parse_qs
-from datetime import datetime
+from datetime import datetime, timezone
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from itertools import islice
+from operator import itemgetter
+from typing import List, NamedTuple, NoReturn, Optional
+from pydantic import BaseModel
+import asyncio
+import gzip
+import hashlib
+import logging
+import os
 import re
+import time
+import msgspec
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+#closes the shared Redis client (if any) on shutdown
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if redis is not None:
+        await redis.aclose()
 
 #creating fastapi
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 #Allowing Cross-Origin Requests
-# Adds middleware to allow requests from any domain (*)
+# Adds middleware to allow requests from the frontend; override with a comma-separated CORS_ORIGINS
+CORS_ORIGINS = [
+    origin.strip()
+    for origin in os.environ.get("CORS_ORIGINS", "https://flask-transcriber-ui.onrender.com").split(",")
+    if origin.strip()
+]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["https://flask-transcriber-ui.onrender.com"],
+    allow_origins=CORS_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-#in-memory transcript storage
-transcript_store = {}
+#compress larger responses; cached transcripts are precompressed below and skipped by the middleware
+#level 6 rather than Starlette's default 9: the middleware compresses on the event loop for every request
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE, compresslevel=GZIP_LEVEL)
+
+#a processed transcript; msgspec structs are smaller than dicts and encode faster
+class TranscriptResult(msgspec.Struct):
+    video_id: str
+    video_url: str
+    transcript: str
+    #summary: str
+    timestamp: str
+    word_count: int
+
+#a cached transcript: the result plus its serialized JSON and ETag, so cache hits skip re-encoding
+#gz_payload is the gzip-compressed payload (None for small payloads), compressed once per entry
+#summary is the default /transcripts projection, precomputed so listing pages skip the transcript text
+class CacheEntry(NamedTuple):
+    data: TranscriptResult
+    payload: bytes
+    etag: str
+    gz_payload: Optional[bytes]
+    summary: dict
+
+SUMMARY_FIELDS = ("video_id", "video_url", "timestamp", "word_count")
+
+def make_entry(data: TranscriptResult, payload: bytes) -> CacheEntry:
+    etag = '"%s"' % hashlib.blake2b(payload, digest_size=16).hexdigest()
+    gz_payload = gzip.compress(payload, compresslevel=GZIP_LEVEL) if len(payload) >= GZIP_MIN_SIZE else None
+    summary = {k: getattr(data, k) for k in SUMMARY_FIELDS}
+    return CacheEntry(data, payload, etag, gz_payload, summary)
+
+def decode_entry(raw: bytes) -> CacheEntry:
+    return make_entry(msgspec.json.decode(raw, type=TranscriptResult), raw)
+
+def json_response(content) -> Response:
+    return Response(content=msgspec.json.encode(content), media_type="application/json")
+
+#in-memory transcript storage, per worker (LRU: most recently used entries live at the end)
+#CACHE_SIZE=0 disables it, leaving Redis (if configured) as the only cache
+MAX_STORE_SIZE = max(0, int(os.environ.get("CACHE_SIZE", "100")))
+transcript_store: "OrderedDict[str, CacheEntry]" = OrderedDict()
+store_lock = asyncio.Lock()
+#video_id -> future resolved by the request currently fetching it (collapses duplicate fetches)
+in_flight: "dict[str, asyncio.Future]" = {}
+
+#shared cache across workers and restarts; only used when REDIS_URL is set
+#(the server should run with maxmemory-policy allkeys-lru so Redis does the eviction).
+#short timeouts turn a hung or unreachable Redis into a RedisError, i.e. a cache miss
+REDIS_TTL = 86400
+#bump the version when cached payloads change shape, so old values are never served
+REDIS_KEY_PREFIX = "yt:v2:"
+REDIS_URL = os.environ.get("REDIS_URL")
+REDIS_TIMEOUT = 0.5
+redis = (
+    aioredis.from_url(
+        REDIS_URL,
+        decode_responses=False,
+        socket_timeout=REDIS_TIMEOUT,
+        socket_connect_timeout=REDIS_TIMEOUT,
+    )
+    if REDIS_URL
+    else None
+)
+
+#batch limits; the semaphore is shared by all batches in this worker, so their combined
+#fetches stay well below YouTube's practical rate limit
+MAX_BATCH_SIZE = 50
+BATCH_CONCURRENCY = 25
+batch_semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+#short-lived cache of definitive fetch failures so retries don't hit YouTube again: video_id -> (expiry, status, detail)
+NEG_CACHE_TTL = 60
+MAX_NEG_CACHE_SIZE = 1000
+neg_cache: "OrderedDict[str, tuple[float, int, str]]" = OrderedDict()
+
+#formatted timestamp, refreshed at most once per second: [iso_string, unix_time]
+_NOW_CACHE = ["", 0.0]
+
+def now_iso() -> str:
+    t = time.time()
+    if t - _NOW_CACHE[1] >= 1.0:
+        _NOW_CACHE[1] = t
+        _NOW_CACHE[0] = datetime.fromtimestamp(t, timezone.utc).isoformat(timespec="seconds")
+    return _NOW_CACHE[0]
+
+#compiled once at import; only used as a fallback for other video paths (/shorts/, /live/, /v/)
+_VIDEO_PATH_RE = re.compile(r'/(?:shorts|live|v)/([0-9A-Za-z_-]{11})(?:/|$)')
+_VIDEO_ID_ALPHABET = b'0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_-'
+
+#deleting every allowed byte leaves nothing behind for a valid ID; the whole check runs in C
+def is_valid_video_id(video_id) -> bool:
+    return (
+        bool(video_id)
+        and len(video_id) == 11
+        and video_id.isascii()
+        and not video_id.encode('ascii').translate(None, _VIDEO_ID_ALPHABET)
+    )
 
 #function to extract yt-video ID
 def extract_video_id(url: str):
     parsed_url = urlparse(url)
-    if parsed_url.hostname in ['www.youtube.com', 'youtube.com']:
-        if parsed_url.path == '/watch':
-            query_params = parse_qs(parsed_url.query)
-            return query_params.get('v', [None])[0]
+    host = parsed_url.hostname or ''
+    video_id = None
+    if host.endswith('youtu.be'):
+        video_id = parsed_url.path.lstrip('/').split('/')[0]
+    elif 'youtube' in host:
         #If URL is in the format youtube.com/watch?v=abc123, it extracts the v query parameter.
+        if parsed_url.path == '/watch':
+            video_id = parse_qs(parsed_url.query).get('v', [None])[0]
         elif parsed_url.path.startswith('/embed/'):
-            return parsed_url.path.split('/embed/')[1]
-    elif parsed_url.hostname == 'youtu.be':
-        return parsed_url.path.lstrip('/')
-    return None
+            video_id = parsed_url.path[len('/embed/'):].split('/')[0]
+        else:
+            match = _VIDEO_PATH_RE.match(parsed_url.path)
+            video_id = match.group(1) if match else None
+    else:
+        return None
+    #whole path segments are taken, so anything but exactly 11 ID characters is rejected here
+    return video_id if is_valid_video_id(video_id) else None
 
 # def summarize_text(text: str) -> str:
 #     sentences = re.split(r'(?<=[.!?]) +', text)
@@ -44,30 +180,214 @@ def extract_video_id(url: str):
 async def root():
     return {"message": "YouTube Transcript API is running."}
 
-#Main route to process yt video
-@app.get("/process")
-async def process_video(video_url: str):
+#If-None-Match uses weak comparison (RFC 9110), so a W/ prefix on the client's tag is ignored
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+#transcripts never change once fetched, so clients can revalidate with If-None-Match
+def transcript_response(entry: CacheEntry, request: Request) -> Response:
+    #the gzip representation gets its own ETag, as strong ETags must differ per content-coding
+    use_gzip = entry.gz_payload is not None and "gzip" in request.headers.get("accept-encoding", "")
+    etag = entry.etag[:-1] + '-gz"' if use_gzip else entry.etag
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400, immutable", "Vary": "Accept-Encoding"}
+    if etag_matches(etag, request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=entry.gz_payload, media_type="application/json", headers=headers)
+    return Response(content=entry.payload, media_type="application/json", headers=headers)
+
+async def remember(video_id: str, entry: CacheEntry):
+    if MAX_STORE_SIZE == 0:
+        return
+    async with store_lock:
+        if video_id not in transcript_store and len(transcript_store) >= MAX_STORE_SIZE:
+            transcript_store.popitem(last=False)
+        transcript_store[video_id] = entry
+        transcript_store.move_to_end(video_id)
+
+#a Redis outage should only cost us the shared cache, never fail the request;
+#values outlive deploys, so one that no longer decodes into TranscriptResult is treated as a miss too
+async def redis_get(video_id: str) -> Optional[CacheEntry]:
+    if redis is None:
+        return None
+    try:
+        raw = await redis.get(REDIS_KEY_PREFIX + video_id)
+    except RedisError:
+        logger.warning("redis get failed for %s", video_id)
+        return None
+    if raw is None:
+        return None
+    try:
+        return decode_entry(raw)
+    except msgspec.DecodeError:
+        logger.warning("ignoring undecodable redis value for %s", video_id)
+        return None
+
+async def redis_set(video_id: str, payload: bytes):
+    if redis is None:
+        return
+    try:
+        await redis.set(REDIS_KEY_PREFIX + video_id, payload, ex=REDIS_TTL)
+    except RedisError:
+        logger.warning("redis set failed for %s", video_id)
+
+#records a definitive failure in the negative cache and raises it as an HTTP error
+async def fail_fetch(video_id: str, status: int, detail: str) -> NoReturn:
+    async with store_lock:
+        if len(neg_cache) >= MAX_NEG_CACHE_SIZE:
+            neg_cache.popitem(last=False)
+        neg_cache[video_id] = (time.monotonic() + NEG_CACHE_TTL, status, detail)
+        neg_cache.move_to_end(video_id)
+    raise HTTPException(status_code=status, detail=detail)
+
+#looks the transcript up in Redis, then YouTube, and stores it; returns the cache entry
+async def fetch_transcript(video_id: str):
+    entry = await redis_get(video_id)
+    if entry is not None:
+        await remember(video_id, entry)
+        return entry
+    #errors map to static details, so failures never format the library's (long) exception messages
+    try:
+        #get_transcript does blocking HTTP, so keep it off the event loop
+        transcript = await run_in_threadpool(YouTubeTranscriptApi.get_transcript, video_id)
+    except TranscriptsDisabled:
+        await fail_fetch(video_id, 404, "Subtitles are disabled for this youtube video")
+    except NoTranscriptFound:
+        await fail_fetch(video_id, 404, "Transcript not available for this youtube video")
+    except VideoUnavailable:
+        await fail_fetch(video_id, 404, "This youtube video is unavailable")
+    except Exception:
+        #possibly transient (network, rate limiting), so not negative-cached
+        logger.exception("transcript fetch failed for %s", video_id)
+        raise HTTPException(status_code=502, detail="Could not fetch the transcript, please try again later")
+    #join and word count both stay in C; split() handles newlines and repeated spaces in captions
+    text = " ".join(map(itemgetter('text'), transcript))
+    word_count = len(text.split())
+    #no JIT path for long transcripts: there is no per-segment Python loop left to compile,
+    #and flattening into a numpy byte buffer would cost more than str.split itself
+    #summary = summarize_text(text)
+    data = TranscriptResult(
+        video_id=video_id,
+        #canonical URL, not the caller's: the entry is shared and may carry share-tracking parameters
+        video_url=f"https://www.youtube.com/watch?v={video_id}",
+        transcript=text,
+        #summary=summary,
+        timestamp=now_iso(),
+        word_count=word_count,
+    )
+    entry = make_entry(data, msgspec.json.encode(data))
+    await remember(video_id, entry)
+    await redis_set(video_id, entry.payload)
+    return entry
+
+#resolves one video URL to a cache entry: local cache, then an in-flight fetch, then Redis/YouTube
+async def _process_single(video_url: str) -> CacheEntry:
     video_id = extract_video_id(video_url)
     if not video_id:
         raise HTTPException(status_code=400, detail="Invalid or unsupported YouTube URL format.")
+    async with store_lock:
+        entry = transcript_store.get(video_id)
+        if entry is not None:
+            transcript_store.move_to_end(video_id)
+            return entry
+        failure = neg_cache.get(video_id)
+        if failure is not None:
+            if time.monotonic() < failure[0]:
+                raise HTTPException(status_code=failure[1], detail=failure[2])
+            del neg_cache[video_id]
+        #another request is already fetching this video: wait for its result instead
+        fut = in_flight.get(video_id)
+        is_owner = fut is None
+        if is_owner:
+            fut = asyncio.get_running_loop().create_future()
+            in_flight[video_id] = fut
+    if not is_owner:
+        return await asyncio.shield(fut)
     try:
-        transcript = YouTubeTranscriptApi.get_transcript(video_id)
-        text = " ".join([item['text'] for item in transcript])
-        #summary = summarize_text(text)
-        data = {
-            "video_id": video_id,
-            "video_url": video_url,
-            "transcript": text,
-            #"summary": summary,
-            "timestamp": datetime.now().isoformat()
-        }
-        transcript_store[video_id] = data
-        return data
+        entry = await fetch_transcript(video_id)
+        fut.set_result(entry)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Transcript not available for this youtube video")
+        fut.set_exception(e)
+        fut.exception()  #mark as retrieved so failures with no waiters aren't logged
+        raise
+    finally:
+        async with store_lock:
+            in_flight.pop(video_id, None)
+        if not fut.done():
+            fut.cancel()
+    return entry
+
+#Main route to process yt video
+@app.get("/process")
+async def process_video(video_url: str, request: Request):
+    entry = await _process_single(video_url)
+    return transcript_response(entry, request)
+
+class BatchRequest(BaseModel):
+    urls: List[str]
+
+#processes several videos in one call; fetches across all batches are capped at BATCH_CONCURRENCY
+#each result is the cached JSON payload, or {"video_url", "status", "error"} for a failed URL
+@app.post("/process/batch")
+async def process_batch(batch: BatchRequest):
+    if len(batch.urls) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} URLs per batch.")
+
+    async def one(video_url: str):
+        async with batch_semaphore:
+            return await _process_single(video_url)
+
+    results = await asyncio.gather(*map(one, batch.urls), return_exceptions=True)
+    parts = []
+    for video_url, result in zip(batch.urls, results):
+        if isinstance(result, HTTPException):
+            parts.append(msgspec.json.encode({"video_url": video_url, "status": result.status_code, "error": result.detail}))
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            parts.append(result.payload)
+    return Response(content=b"[" + b",".join(parts) + b"]", media_type="application/json")
 
 @app.get("/all_transcripts")
-async def get_all_transcripts(): 
-    return list(transcript_store.values())
+async def get_all_transcripts():
+    return json_response([entry.data for entry in transcript_store.values()])
+
+#paginated listing; slices the store directly instead of copying every entry first
+#fields is a comma-separated projection, e.g. fields=video_id,transcript
+@app.get("/transcripts")
+async def list_transcripts(
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    fields: str = Query(",".join(SUMMARY_FIELDS)),
+):
+    wanted = frozenset(f.strip() for f in fields.split(","))
+    async with store_lock:
+        page = islice(transcript_store.values(), offset, offset + limit)
+        if wanted == frozenset(SUMMARY_FIELDS):
+            results = [entry.summary for entry in page]
+        else:
+            keys = [k for k in TranscriptResult.__struct_fields__ if k in wanted]
+            results = [{k: getattr(entry.data, k) for k in keys} for entry in page]
+        count = len(transcript_store)
+    return {"count": count, "limit": limit, "offset": offset, "results": results}
+
+#returns a previously processed transcript without fetching from YouTube
+@app.get("/transcripts/{video_id}")
+async def get_stored_transcript(video_id: str, request: Request):
+    async with store_lock:
+        entry = transcript_store.get(video_id)
+        if entry is not None:
+            transcript_store.move_to_end(video_id)
+    if entry is None:
+        entry = await redis_get(video_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Transcript not found.")
+        await remember(video_id, entry)
+    return transcript_response(entry, request)
 
 
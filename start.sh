@@ -1,7 +1,11 @@
 #!/bin/bash
 
 # Start the FastAPI backend in the background
-uvicorn backend:app --host 0.0.0.0 --port 8001 &
+# uvloop/httptools for faster I/O, one worker per core unless WEB_CONCURRENCY is set
+uvicorn backend:app --host 0.0.0.0 --port 8001 \
+    --loop uvloop --http httptools \
+    --workers "${WEB_CONCURRENCY:-$(nproc)}" \
+    --backlog 2048 --limit-concurrency 1000 &
 
 # Optional delay to ensure backend is ready
 sleep 2
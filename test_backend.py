@@ -0,0 +1,375 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from redis.exceptions import TimeoutError as RedisTimeoutError
+from youtube_transcript_api import NoTranscriptFound, TranscriptsDisabled, VideoUnavailable
+
+import backend
+
+VIDEO_ID = "dQw4w9WgXcQ"
+VIDEO_URL = f"https://youtu.be/{VIDEO_ID}"
+
+
+#stand-in for YouTubeTranscriptApi.get_transcript that records calls and can be held open
+class FakeYouTube:
+    def __init__(self, segments=None, error=None):
+        self.segments = segments if segments is not None else [{"text": "hello world"}, {"text": "again"}]
+        self.error = error
+        self.calls = []
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, video_id, *args, **kwargs):
+        self.calls.append(video_id)
+        self.entered.set()
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.segments
+
+
+#in_flight map that records when a request found (and is about to wait on) another request's fetch
+class WatchedInFlight(dict):
+    def __init__(self):
+        super().__init__()
+        self.joined = threading.Event()
+
+    def get(self, key, default=None):
+        fut = super().get(key, default)
+        if fut is not None:
+            self.joined.set()
+        return fut
+
+
+def wait_until(event, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not event.is_set():
+        assert time.monotonic() < deadline, "timed out waiting"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeYouTube()
+    monkeypatch.setattr(backend.YouTubeTranscriptApi, "get_transcript", fake)
+    monkeypatch.setattr(backend, "redis", None)
+    monkeypatch.setattr(backend, "in_flight", WatchedInFlight())
+    backend.transcript_store.clear()
+    backend.neg_cache.clear()
+    return fake
+
+
+@pytest.fixture
+def client():
+    with TestClient(backend.app) as client:
+        yield client
+
+
+def process(client, url=VIDEO_URL, **kwargs):
+    return client.get("/process", params={"video_url": url}, **kwargs)
+
+
+def process_concurrently(client, fake):
+    #holds the first fetch open until the second request is parked on its in-flight future
+    fake.release.clear()
+    responses = [None, None]
+
+    def call(i):
+        responses[i] = process(client)
+
+    first = threading.Thread(target=call, args=(0,))
+    first.start()
+    wait_until(fake.entered)
+    second = threading.Thread(target=call, args=(1,))
+    second.start()
+    wait_until(backend.in_flight.joined)
+    fake.release.set()
+    first.join(5)
+    second.join(5)
+    return responses
+
+
+def test_concurrent_requests_share_one_fetch(client, fake):
+    responses = process_concurrently(client, fake)
+    assert fake.calls == [VIDEO_ID]
+    assert [r.status_code for r in responses] == [200, 200]
+    assert responses[0].json() == responses[1].json()
+    assert not backend.in_flight
+
+
+def test_fetch_error_propagates_to_waiter(client, fake):
+    fake.error = RuntimeError("upstream down")
+    responses = process_concurrently(client, fake)
+    assert fake.calls == [VIDEO_ID]
+    assert [r.status_code for r in responses] == [502, 502]
+    assert not backend.in_flight
+
+
+def test_cached_url_is_canonical(client, fake):
+    first = process(client, f"https://youtu.be/{VIDEO_ID}?si=tracking")
+    second = process(client, f"https://www.youtube.com/watch?v={VIDEO_ID}")
+    assert first.json()["video_url"] == f"https://www.youtube.com/watch?v={VIDEO_ID}"
+    assert second.json() == first.json()
+
+
+def test_lru_evicts_least_recently_used(client, fake, monkeypatch):
+    monkeypatch.setattr(backend, "MAX_STORE_SIZE", 2)
+    a, b, c = "aaaaaaaaaaa", "bbbbbbbbbbb", "ccccccccccc"
+    for video_id in (a, b, a, c):
+        assert process(client, f"https://youtu.be/{video_id}").status_code == 200
+    assert list(backend.transcript_store) == [a, c]
+    assert fake.calls == [a, b, c]
+
+
+@pytest.mark.parametrize("url", [
+    f"https://www.youtube.com/watch?v={VIDEO_ID}",
+    f"https://www.youtube.com/watch?v={VIDEO_ID}&t=42&si=abc",
+    f"https://m.youtube.com/watch?v={VIDEO_ID}",
+    f"https://youtu.be/{VIDEO_ID}",
+    f"https://youtu.be/{VIDEO_ID}?t=3",
+    f"https://www.youtube.com/embed/{VIDEO_ID}",
+    f"https://www.youtube.com/embed/{VIDEO_ID}?start=10",
+    f"https://www.youtube.com/shorts/{VIDEO_ID}",
+    f"https://m.youtube.com/shorts/{VIDEO_ID}",
+    f"https://www.youtube.com/live/{VIDEO_ID}?si=abc",
+    f"https://www.youtube.com/v/{VIDEO_ID}",
+])
+def test_extract_video_id_accepts_video_urls(url):
+    assert backend.extract_video_id(url) == VIDEO_ID
+
+
+@pytest.mark.parametrize("url", [
+    f"https://youtu.be/{VIDEO_ID}extra",
+    f"https://www.youtube.com/embed/{VIDEO_ID}extra",
+    f"https://www.youtube.com/shorts/{VIDEO_ID}extra",
+    "https://www.youtube.com/watch?v=tooshort",
+    "https://www.youtube.com/channel/UCabcdefghijklmnopqrstuv",
+    "https://www.youtube.com/user/abcdefghijklmno",
+    "https://www.youtube.com/c/abcdefghijklmno",
+    f"https://example.com/watch?v={VIDEO_ID}",
+    "not a url",
+])
+def test_extract_video_id_rejects_other_urls(url):
+    assert backend.extract_video_id(url) is None
+
+
+def test_invalid_url_is_rejected_without_fetching(client, fake):
+    response = process(client, "https://www.youtube.com/channel/UCabcdefghijklmnopqrstuv")
+    assert response.status_code == 400
+    assert fake.calls == []
+
+
+def test_word_count_handles_newlines_and_extra_spaces(client, fake):
+    fake.segments = [{"text": "hello\nworld"}, {"text": "  a  b "}, {"text": ""}]
+    assert process(client).json()["word_count"] == 4
+
+
+def test_negative_cache_short_circuits_repeat_failures(client, fake):
+    fake.error = TranscriptsDisabled(VIDEO_ID)
+    first = process(client)
+    second = process(client)
+    assert first.status_code == second.status_code == 404
+    assert first.json() == second.json()
+    assert fake.calls == [VIDEO_ID]
+
+
+def test_negative_cache_entries_expire(client, fake):
+    fake.error = TranscriptsDisabled(VIDEO_ID)
+    process(client)
+    backend.neg_cache[VIDEO_ID] = (time.monotonic() - 1, 404, "expired")
+    assert process(client).status_code == 404
+    assert fake.calls == [VIDEO_ID, VIDEO_ID]
+
+
+@pytest.mark.parametrize("video_id, valid", [
+    (VIDEO_ID, True),
+    ("a-b_c1234Z9", True),
+    ("dQw4w9WgXc!", False),
+    ("dQw4w9WgXcé", False),
+    ("dQw4w9WgXc", False),
+    ("dQw4w9WgXcQQ", False),
+    ("", False),
+    (None, False),
+])
+def test_is_valid_video_id(video_id, valid):
+    assert backend.is_valid_video_id(video_id) is valid
+
+
+#minimal async Redis stand-in; raises the given error from every call when set
+class FakeRedis:
+    def __init__(self, error=None):
+        self.values = {}
+        self.error = error
+
+    async def get(self, key):
+        if self.error is not None:
+            raise self.error
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        if self.error is not None:
+            raise self.error
+        self.values[key] = value
+
+
+def test_redis_timeout_is_a_cache_miss(client, fake, monkeypatch):
+    monkeypatch.setattr(backend, "redis", FakeRedis(error=RedisTimeoutError("timed out")))
+    assert process(client).status_code == 200
+    assert client.get(f"/transcripts/{VIDEO_ID}").status_code == 200
+    assert fake.calls == [VIDEO_ID]
+
+
+def test_redis_shares_entries_between_workers(client, fake, monkeypatch):
+    monkeypatch.setattr(backend, "redis", FakeRedis())
+    first = process(client)
+    #another worker: empty local cache, same Redis
+    backend.transcript_store.clear()
+    second = process(client)
+    assert second.json() == first.json()
+    assert fake.calls == [VIDEO_ID]
+
+
+@pytest.mark.parametrize("if_none_match", ["{etag}", "W/{etag}", '"other", {etag}', "*"])
+def test_matching_etag_returns_304(client, fake, if_none_match):
+    etag = process(client).headers["etag"]
+    headers = {"If-None-Match": if_none_match.format(etag=etag)}
+    for response in (process(client, headers=headers), client.get(f"/transcripts/{VIDEO_ID}", headers=headers)):
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+    assert fake.calls == [VIDEO_ID]
+
+
+def test_stale_etag_returns_full_body(client, fake):
+    process(client)
+    response = process(client, headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+    assert response.json()["video_id"] == VIDEO_ID
+
+
+def fill_store(client, count):
+    video_ids = [f"vid{i:08d}" for i in range(count)]
+    for video_id in video_ids:
+        assert process(client, f"https://youtu.be/{video_id}").status_code == 200
+    return video_ids
+
+
+def test_transcripts_pagination(client, fake):
+    video_ids = fill_store(client, 5)
+    page = client.get("/transcripts", params={"limit": 2, "offset": 1}).json()
+    assert page["count"] == 5
+    assert (page["limit"], page["offset"]) == (2, 1)
+    assert [item["video_id"] for item in page["results"]] == video_ids[1:3]
+    assert client.get("/transcripts", params={"offset": 5}).json()["results"] == []
+    assert client.get("/transcripts", params={"limit": 0}).status_code == 422
+
+
+def test_transcripts_default_projection_omits_text(client, fake):
+    fill_store(client, 2)
+    item = client.get("/transcripts").json()["results"][0]
+    assert set(item) == set(backend.SUMMARY_FIELDS)
+
+
+def test_transcripts_custom_projection(client, fake):
+    fill_store(client, 2)
+    results = client.get("/transcripts", params={"fields": "video_id, transcript,unknown"}).json()["results"]
+    assert results == [
+        {"video_id": "vid00000000", "transcript": "hello world again"},
+        {"video_id": "vid00000001", "transcript": "hello world again"},
+    ]
+
+
+def test_batch_mixes_results_and_errors(client, fake, monkeypatch):
+    ok = process(client).json()
+    disabled = "ddddddddddd"
+
+    def get_transcript(video_id, *args, **kwargs):
+        fake.calls.append(video_id)
+        if video_id == disabled:
+            raise TranscriptsDisabled(video_id)
+        return fake.segments
+
+    monkeypatch.setattr(backend.YouTubeTranscriptApi, "get_transcript", get_transcript)
+    urls = [VIDEO_URL, "junk", f"https://youtu.be/{disabled}", "https://youtu.be/eeeeeeeeeee"]
+    response = client.post("/process/batch", json={"urls": urls})
+    assert response.status_code == 200
+    results = response.json()
+    assert results[0] == ok
+    assert results[1] == {"video_url": "junk", "status": 400, "error": "Invalid or unsupported YouTube URL format."}
+    assert results[2]["status"] == 404 and results[2]["video_url"] == urls[2]
+    assert results[3]["video_id"] == "eeeeeeeeeee"
+    assert fake.calls == [VIDEO_ID, disabled, "eeeeeeeeeee"]
+
+
+def test_batch_rejects_too_many_urls(client, fake):
+    urls = [VIDEO_URL] * (backend.MAX_BATCH_SIZE + 1)
+    assert client.post("/process/batch", json={"urls": urls}).status_code == 400
+    assert fake.calls == []
+
+
+@pytest.mark.parametrize("stale", [b"not json", b'{"video_id": "dQw4w9WgXcQ"}'])
+def test_undecodable_redis_value_is_a_miss(client, fake, monkeypatch, stale):
+    redis = FakeRedis()
+    redis.values[backend.REDIS_KEY_PREFIX + VIDEO_ID] = stale
+    monkeypatch.setattr(backend, "redis", redis)
+    assert client.get(f"/transcripts/{VIDEO_ID}").status_code == 404
+    response = process(client)
+    assert response.status_code == 200
+    assert fake.calls == [VIDEO_ID]
+    #the refetched value replaces the stale one
+    assert redis.values[backend.REDIS_KEY_PREFIX + VIDEO_ID] == response.content
+
+
+@pytest.mark.parametrize("encoding", ["identity", "gzip"])
+def test_precompressed_transcript_and_etag(client, fake, encoding):
+    #long enough to get a precompressed gzip payload
+    fake.segments = [{"text": "some words in a caption line"}] * 100
+    headers = {"Accept-Encoding": encoding}
+    response = process(client, headers=headers)
+    etag = response.headers["etag"]
+    assert response.status_code == 200
+    assert response.json()["word_count"] == 600
+    if encoding == "gzip":
+        assert response.headers["content-encoding"] == "gzip"
+        assert etag.endswith('-gz"')
+    else:
+        assert "content-encoding" not in response.headers
+        assert not etag.endswith('-gz"')
+
+    headers["If-None-Match"] = etag
+    cached = process(client, headers=headers)
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert "content-encoding" not in cached.headers
+    assert fake.calls == [VIDEO_ID]
+
+
+def test_gzip_etag_does_not_match_identity_representation(client, fake):
+    fake.segments = [{"text": "some words in a caption line"}] * 100
+    gz_etag = process(client, headers={"Accept-Encoding": "gzip"}).headers["etag"]
+    response = process(client, headers={"Accept-Encoding": "identity", "If-None-Match": gz_etag})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("error, detail", [
+    (TranscriptsDisabled(VIDEO_ID), "Subtitles are disabled for this youtube video"),
+    (NoTranscriptFound(VIDEO_ID, ["en"], {}), "Transcript not available for this youtube video"),
+    (VideoUnavailable(VIDEO_ID), "This youtube video is unavailable"),
+])
+def test_known_fetch_errors_map_to_404(client, fake, error, detail):
+    fake.error = error
+    response = process(client)
+    assert response.status_code == 404
+    assert response.json() == {"detail": detail}
+
+
+def test_unexpected_fetch_error_is_502_and_not_cached(client, fake):
+    fake.error = RuntimeError("upstream down")
+    assert process(client).status_code == 502
+    assert VIDEO_ID not in backend.neg_cache
+    fake.error = None
+    assert process(client).status_code == 200
+    assert fake.calls == [VIDEO_ID, VIDEO_ID]